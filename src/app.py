@@ -1,8 +1,16 @@
 import os
 import json
-import joblib
+import time
+import secrets
+import numpy as np
 import pandas as pd
 import streamlit as st
+import plotly.express as px
+
+import startup
+import telemetry
+import whatif
+from audit import AuditLogger, LOADTEST_TOKEN_ENV
 
 # ===================== CONFIGURAÇÃO DO TEMA E LAYOUT =====================
 st.set_page_config(
@@ -103,8 +111,39 @@ st.markdown("""
 # ===================== FUNÇÕES DE CARREGAMENTO =====================
 @st.cache_resource
 def load_model():
-    model_path = os.path.join("models", "obesity_model.joblib")
-    return joblib.load(model_path)
+    return startup.get_model()
+
+@st.cache_resource
+def load_model_version():
+    return startup.get_model_version()
+
+@st.cache_resource
+def load_explainer():
+    return startup.get_explainer()
+
+@st.cache_resource
+def get_audit_logger():
+    # Uma única thread de escrita por processo, compartilhada entre as sessões
+    return AuditLogger()
+
+def is_audited_session():
+    # Fora da auditoria: a sessão de aquecimento do startup.py e as sessões do teste de
+    # carga. O marcador do teste de carga (?loadtest=<token>) só vale quando o servidor foi
+    # iniciado com o mesmo token; sem ele, um parâmetro na URL não desliga a auditoria
+    if st.session_state.get("warmup"):
+        return False
+    token = os.environ.get(LOADTEST_TOKEN_ENV)
+    marker = st.query_params.get("loadtest")
+    return not (token and marker and secrets.compare_digest(marker, token))
+
+@st.cache_data
+def load_reference():
+    # Faixas observadas no treino (min/max), usadas como limites das simulações
+    reference_path = os.path.join("models", "reference.json")
+    if os.path.exists(reference_path):
+        with open(reference_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
 
 def load_metrics():
     metrics_path = os.path.join("models", "metrics.json")
@@ -172,6 +211,102 @@ CLASS_MAP = {
     "Obesity_Type_III": "Obesidade Grau III (Mórbida)"
 }
 
+FEATURE_LABELS = {
+    "Gender": "Gênero",
+    "Age": "Idade",
+    "Height": "Altura",
+    "Weight": "Peso",
+    "family_history": "Histórico familiar",
+    "FAVC": "Alimentos hipercalóricos",
+    "FCVC": "Consumo de vegetais",
+    "NCP": "Refeições principais",
+    "CAEC": "Come entre refeições",
+    "SMOKE": "Tabagismo",
+    "CH2O": "Consumo de água",
+    "SCC": "Monitora calorias",
+    "FAF": "Atividade física",
+    "TUE": "Uso de dispositivos",
+    "CALC": "Álcool",
+    "MTRANS": "Transporte",
+}
+
+# ===================== SIMULAÇÃO "E SE?" =====================
+WHATIF_FEATURES = ["Weight", "FAF", "CH2O", "FCVC", "TUE", "NCP", "Age", "Height"]
+WHATIF_FALLBACK_RANGES = {
+    "Weight": (39.0, 173.0), "FAF": (0.0, 3.0), "CH2O": (1.0, 3.0), "FCVC": (1.0, 3.0),
+    "TUE": (0.0, 2.0), "NCP": (1.0, 4.0), "Age": (14.0, 61.0), "Height": (1.45, 1.98),
+}
+
+def whatif_bounds(feature, current):
+    reference = load_reference()
+    if reference and feature in reference["numeric"]:
+        lo, hi = reference["numeric"][feature]["min"], reference["numeric"][feature]["max"]
+    else:
+        lo, hi = WHATIF_FALLBACK_RANGES[feature]
+    lo, hi = float(min(lo, current)), float(max(hi, current))
+    span = hi - lo
+    default = (max(lo, current - span * 0.25), min(hi, current + span * 0.25))
+    return lo, hi, default
+
+@st.fragment
+def show_what_if(row):
+    # Fragmento: mexer nos controles reexecuta só este painel, não o app inteiro
+    st.subheader("🧪 Simulação: E se?")
+    st.caption("Variações do paciente atual pontuadas em uma única chamada ao modelo.")
+
+    modo = st.radio("Tipo de simulação", ["Uma variável", "Duas variáveis"], horizontal=True, key="whatif_mode")
+
+    def label(feature):
+        return FEATURE_LABELS.get(feature, feature)
+
+    col_a, col_b = st.columns(2)
+    fx = col_a.selectbox("Variável", WHATIF_FEATURES, format_func=label, key="whatif_fx")
+    x_cur = float(row.iloc[0][fx])
+    x_lo, x_hi, x_default = whatif_bounds(fx, x_cur)
+    x_range = col_a.slider(f"Faixa de {label(fx)}", x_lo, x_hi, x_default, key=f"whatif_range_{fx}")
+
+    if modo == "Uma variável":
+        inicio = time.perf_counter()
+        curvas = whatif.sweep(model, row, fx, *x_range)
+        longo = curvas.melt(id_vars=fx, var_name="Classe", value_name="Probabilidade")
+        longo["Classe"] = longo["Classe"].map(lambda c: CLASS_MAP.get(c, c))
+        fig = px.line(longo, x=fx, y="Probabilidade", color="Classe", labels={fx: label(fx)})
+        fig.add_vline(x=x_cur, line_dash="dash", line_color="#6c757d", annotation_text="Atual")
+        n_variacoes = len(curvas)
+    else:
+        opcoes_y = [f for f in WHATIF_FEATURES if f != fx]
+        fy = col_b.selectbox("Segunda variável", opcoes_y, format_func=label, key="whatif_fy")
+        y_cur = float(row.iloc[0][fy])
+        y_lo, y_hi, y_default = whatif_bounds(fy, y_cur)
+        y_range = col_b.slider(f"Faixa de {label(fy)}", y_lo, y_hi, y_default, key=f"whatif_range_{fy}")
+
+        inicio = time.perf_counter()
+        xs, ys, codes, _ = whatif.grid(model, row, fx, x_range, fy, y_range)
+        # classes_ vem em ordem alfabética: reordena pela gravidade (ordem do CLASS_MAP)
+        # para a escala ir do verde (baixo peso) ao vermelho (obesidade grau III)
+        gravidade = sorted(model.classes_, key=lambda c: list(CLASS_MAP).index(c) if c in CLASS_MAP else len(CLASS_MAP))
+        posicao = np.array([gravidade.index(c) for c in model.classes_])
+        codes = posicao[codes]
+        classes = [CLASS_MAP.get(c, c) for c in gravidade]
+        fig = px.imshow(
+            codes, x=xs, y=ys, origin="lower", aspect="auto",
+            color_continuous_scale="RdYlGn_r", zmin=0, zmax=len(classes) - 1,
+            labels={"x": label(fx), "y": label(fy), "color": "Classe"},
+        )
+        fig.update_traces(
+            customdata=[[classes[c] for c in linha] for linha in codes],
+            hovertemplate=f"{label(fx)}: %{{x:.2f}}<br>{label(fy)}: %{{y:.2f}}<br>%{{customdata}}<extra></extra>",
+        )
+        fig.update_coloraxes(colorbar=dict(tickvals=list(range(len(classes))), ticktext=classes))
+        fig.add_scatter(x=[x_cur], y=[y_cur], mode="markers", marker=dict(symbol="x", size=12, color="black"),
+                        name="Atual", showlegend=False)
+        n_variacoes = codes.size
+
+    tempo_ms = (time.perf_counter() - inicio) * 1000
+    fig.update_layout(height=420, margin=dict(l=10, r=10, t=30, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{n_variacoes} variações avaliadas em {tempo_ms:.0f} ms")
+
 
 # ===================== BARRA LATERAL COM DASHBOARD =====================
 with st.sidebar:
@@ -305,9 +440,13 @@ with col_center:
     )
 # ===================== PROCESSAMENTO E RESULTADOS =====================
 if predict_btn:
+    predict_inicio = time.perf_counter()
+
     # Atualizar barra de progresso
     progress_placeholder.progress(50, text="Processando dados do paciente...")
     
+    traducao_inicio = time.perf_counter()
+
     # Converter Sim/Não para yes/no (se o modelo foi treinado em inglês)
     family_history_en = "yes" if family_history == "Sim" else "no"
     favc_en = "yes" if favc == "Sim" else "no"
@@ -325,32 +464,43 @@ if predict_btn:
         "Bicicleta": "Bike"
     }
     
-    row = pd.DataFrame([{
-        "Gender": gender,
-        "Age": float(age),
-        "Height": float(height),
-        "Weight": float(weight),
-        "family_history": family_history_en,
-        "FAVC": favc_en,
-        "FCVC": float(fcvc),
-        "NCP": float(ncp),
-        "CAEC": caec_map.get(caec, caec),
-        "SMOKE": smoke_en,
-        "CH2O": float(ch2o),
-        "SCC": scc_en,
-        "FAF": float(faf),
-        "TUE": float(tue),
-        "CALC": calc_map.get(calc, calc),
-        "MTRANS": mtrans_map.get(mtrans, mtrans),
-    }])
+    telemetry.record("predict.translate", time.perf_counter() - traducao_inicio)
+
+    with telemetry.span("predict.dataframe"):
+        row = pd.DataFrame([{
+            "Gender": gender,
+            "Age": float(age),
+            "Height": float(height),
+            "Weight": float(weight),
+            "family_history": family_history_en,
+            "FAVC": favc_en,
+            "FCVC": float(fcvc),
+            "NCP": float(ncp),
+            "CAEC": caec_map.get(caec, caec),
+            "SMOKE": smoke_en,
+            "CH2O": float(ch2o),
+            "SCC": scc_en,
+            "FAF": float(faf),
+            "TUE": float(tue),
+            "CALC": calc_map.get(calc, calc),
+            "MTRANS": mtrans_map.get(mtrans, mtrans),
+        }])
     
-    # Realizar predição
+    # Realizar predição (pré-processamento e modelo medidos separadamente)
     progress_placeholder.progress(75, text="Executando modelo preditivo...")
     with st.spinner("Processando avaliação..."):
-        pred = model.predict(row)[0]
+        with telemetry.span("predict.preprocess"):
+            row_prep = model.named_steps["prep"].transform(row)
+        with telemetry.span("predict.model"):
+            estimator = model.named_steps["model"]
+            proba = estimator.predict_proba(row_prep)[0]
+            pred = estimator.classes_[proba.argmax()]
     pred_pt = CLASS_MAP.get(pred, pred)
     progress_placeholder.progress(100, text="Avaliação concluída!")
     progress_placeholder.empty()
+
+    render_inicio = time.perf_counter()
+    explain_tempo = 0.0  # descontado do render: já vai para predict.explain
     
     # ===================== ÁREA DE RESULTADOS =====================
     st.header("📋 Resultado da Avaliação")
@@ -391,6 +541,38 @@ if predict_btn:
             else:
                 st.success("🟢 Risco Baixo")
         
+        # Fatores que mais pesaram na classe prevista
+        explainer = load_explainer()
+        if explainer is not None:
+            explain_inicio = time.perf_counter()
+            contrib = explainer.explain_class(row, pred).head(8)
+            explain_tempo = time.perf_counter() - explain_inicio
+            telemetry.record("predict.explain", explain_tempo)
+
+            with st.expander("🔬 Fatores que Influenciaram a Classificação", expanded=True):
+                contrib_df = pd.DataFrame({
+                    "Fator": [FEATURE_LABELS.get(f, f) for f in contrib.index],
+                    "Contribuição (p.p.)": contrib.to_numpy() * 100,
+                })
+                contrib_df["Efeito"] = [
+                    "Aumenta" if v > 0 else "Reduz" for v in contrib_df["Contribuição (p.p.)"]
+                ]
+                fig_contrib = px.bar(
+                    contrib_df.iloc[::-1],
+                    x="Contribuição (p.p.)",
+                    y="Fator",
+                    color="Efeito",
+                    orientation="h",
+                    color_discrete_map={"Aumenta": "#e74c3c", "Reduz": "#3498db"},
+                )
+                fig_contrib.update_layout(height=320, margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(fig_contrib, use_container_width=True)
+                st.caption(
+                    f"Pontos percentuais somados à probabilidade de **{pred_pt}** "
+                    f"({proba.max() * 100:.1f}%) a partir da média da base de treino "
+                    f"({explainer.bias[proba.argmax()] * 100:.1f}%)."
+                )
+
         st.markdown("---")
         
         # Recomendações detalhadas
@@ -465,6 +647,24 @@ if predict_btn:
                 - Prevenção de comorbidades
                 - Qualidade de vida
                 """)
+
+    predict_fim = time.perf_counter()
+    telemetry.record("predict.render", predict_fim - render_inicio - explain_tempo)
+    telemetry.record("predict.total", predict_fim - predict_inicio)
+    telemetry.export_if_due()
+
+    # Registro de auditoria: apenas enfileirado, gravado em segundo plano
+    if is_audited_session():
+        get_audit_logger().log({
+            "inputs": row.iloc[0].to_dict(),
+            "prediction": str(pred),
+            "probabilities": {str(c): float(p) for c, p in zip(estimator.classes_, proba)},
+            "model_version": load_model_version(),
+            "latency_ms": (predict_fim - predict_inicio) * 1000,
+        })
+
+    st.markdown("---")
+    show_what_if(row)
     
    
 # Notas importantes fixas
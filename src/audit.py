@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone
+
+# ===================== CONFIGURAÇÃO =====================
+AUDIT_DIR_ENV = "OBESITY_AUDIT_DIR"             # diretório alternativo (ex.: teste de carga)
+LOADTEST_TOKEN_ENV = "OBESITY_LOADTEST_TOKEN"   # token que marca as sessões do teste de carga
+AUDIT_DIR = os.environ.get(AUDIT_DIR_ENV) or os.path.join("logs", "audit")
+AUDIT_FILE = "audit.jsonl"
+
+QUEUE_SIZE = 10_000           # registros pendentes antes de aplicar a política de estouro
+BATCH_SIZE = 500              # registros gravados por escrita
+FLUSH_INTERVAL = 1.0          # segundos máximos que um registro espera na fila
+MAX_BYTES = 50 * 1024 * 1024  # tamanho do arquivo ativo antes da rotação
+RETRY_MIN = 0.1               # espera inicial (s) após uma falha de escrita
+RETRY_MAX = 5.0               # espera máxima (s) entre novas tentativas
+
+
+class AuditLogger:
+    """Grava avaliações em JSONL a partir de uma thread de fundo.
+
+    O caminho de predição apenas enfileira o registro (``log`` nunca bloqueia).
+    Com a fila cheia, o registro novo é descartado e contabilizado em ``dropped``,
+    para que a latência do clínico nunca dependa do disco.
+
+    Falhas de disco não derrubam a thread: o lote é mantido e regravado com espera
+    crescente, cada falha conta em ``write_errors`` e é reportada no stderr.
+    """
+
+    def __init__(self, directory=AUDIT_DIR, filename=AUDIT_FILE, queue_size=QUEUE_SIZE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+
+        self.dropped = 0
+        self.written = 0
+        self._counts = threading.Lock()  # log() roda em várias threads de sessão ao mesmo tempo
+        self.write_errors = 0
+        self.last_error = None
+        self._rotate_error = None
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+
+        os.makedirs(directory, exist_ok=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---------- lado do chamador ----------
+    def log(self, record: dict) -> bool:
+        record.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._counts:
+                self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    # ---------- thread de escrita ----------
+    def _run(self):
+        batch = []
+        retry = RETRY_MIN
+        while batch or not (self._stop.is_set() and self._queue.empty()):
+            if not batch:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+            try:
+                self._write(batch)
+            except Exception as exc:
+                self._report(exc, len(batch))
+                if self._stop.is_set():
+                    # Encerrando: não há como esperar o disco voltar
+                    with self._counts:
+                        self.dropped += len(batch)
+                    print(f"[audit] {len(batch)} registros perdidos no encerramento", file=sys.stderr)
+                    batch = []
+                    continue
+                self._stop.wait(retry)  # close() interrompe a espera
+                retry = min(retry * 2, RETRY_MAX)
+                continue
+            if self.last_error is not None:
+                print(f"[audit] escrita restabelecida após {self.write_errors} falhas", file=sys.stderr)
+                self.last_error = None
+            batch = []
+            retry = RETRY_MIN
+
+    def _report(self, exc, pending):
+        # Uma linha por sequência de falhas; o contador segue acumulando
+        self.write_errors += 1
+        if self.last_error is None:
+            print(f"[audit] falha ao gravar {pending} registros em {self.path}: {exc!r}; "
+                  "tentando de novo", file=sys.stderr)
+        self.last_error = repr(exc)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+        os.makedirs(self.directory, exist_ok=True)  # recria o diretório se foi removido
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            size = f.tell()
+        with self._counts:
+            self.written += len(batch)
+        if size >= self.max_bytes:
+            try:
+                self._rotate()
+                self._rotate_error = None
+            except OSError as exc:
+                # O lote já foi gravado: a rotação é tentada de novo na próxima escrita
+                self.write_errors += 1
+                if self._rotate_error is None:
+                    print(f"[audit] falha ao rotacionar {self.path}: {exc!r}", file=sys.stderr)
+                self._rotate_error = repr(exc)
+
+    def _rotate(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        base, ext = os.path.splitext(self.path)
+        os.replace(self.path, f"{base}-{stamp}{ext}")
+
+
+# ===================== BENCHMARK DE RAJADA =====================
+def _benchmark(n=10_000, amostras=200):
+    import tempfile
+    import joblib
+    import numpy as np
+    import pandas as pd
+
+    model = joblib.load(os.path.join("models", "obesity_model.joblib"))
+    df = pd.read_csv(os.path.join("data", "obesity.csv"))
+    rows = df.drop(columns=["Obesity"]).sample(n, replace=True, random_state=42)
+    X = model.named_steps["prep"].transform(rows)
+    forest = model.named_steps["model"]
+    proba = forest.predict_proba(X)
+    records = [
+        {
+            "inputs": inputs,
+            "prediction": str(forest.classes_[int(np.argmax(p))]),
+            "probabilities": p.tolist(),
+            "model_version": "benchmark",
+            "latency_ms": 0.0,
+        }
+        for inputs, p in zip(rows.to_dict(orient="records"), proba)
+    ]
+
+    def predicao(i):
+        start = time.perf_counter()
+        forest.predict_proba(X[i:i + 1])
+        return time.perf_counter() - start
+
+    base = np.array([predicao(i) for i in range(amostras)])
+
+    # A rajada é distribuída entre as predições medidas, com a thread de escrita ativa
+    passo = n // amostras
+    durante, enqueue = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = AuditLogger(directory=tmp)
+        for i, record in enumerate(records):
+            start = time.perf_counter()
+            logger.log(record)
+            enqueue.append(time.perf_counter() - start)
+            if i % passo == passo - 1:
+                durante.append(predicao(i // passo))
+        logger.close()
+        print(f"Rajada de {n} registros: gravados={logger.written} descartados={logger.dropped} "
+              f"falhas de escrita={logger.write_errors}")
+
+    enqueue = np.array(enqueue)
+    print(f"Enfileirar: p50={np.percentile(enqueue, 50) * 1e6:.1f}µs p99={np.percentile(enqueue, 99) * 1e6:.1f}µs")
+    for nome, tempos in [("sem log", base), ("durante a rajada", np.array(durante))]:
+        print(f"Predição {nome}: p50={np.percentile(tempos, 50) * 1e3:.2f}ms "
+              f"p95={np.percentile(tempos, 95) * 1e3:.2f}ms")
+    print(f"p95 durante / sem log: {np.percentile(durante, 95) / np.percentile(base, 95):.2f}x")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
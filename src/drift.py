@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+REFERENCE_PATH = os.path.join("models", "reference.json")
+CHUNK_SIZE = 500_000
+PSI_ALERT = 0.2   # regra usual: < 0.1 estável, 0.1–0.2 moderado, > 0.2 drift relevante
+EPS = 1e-4
+
+
+def psi(expected, actual) -> float:
+    expected = np.clip(np.asarray(expected, dtype=float), EPS, None)
+    actual = np.clip(np.asarray(actual, dtype=float), EPS, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_distance(expected, actual) -> float:
+    # Distância KS avaliada nas bordas dos bins de referência
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+class DriftAccumulator:
+    """Acumula contagens por bin/categoria, chunk a chunk, com memória constante."""
+
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self.n_rows = 0
+        self.edges = {col: np.asarray(ref["edges"]) for col, ref in reference["numeric"].items()}
+        self.bin_counts = {col: np.zeros(len(e) + 1, dtype=np.int64) for col, e in self.edges.items()}
+        self.missing = {col: 0 for col in reference["numeric"]}
+        self.sums = {col: 0.0 for col in reference["numeric"]}
+        self.cat_counts = {col: {} for col in reference["categorical"]}
+
+    @property
+    def columns(self):
+        return list(self.reference["numeric"]) + list(self.reference["categorical"])
+
+    def update(self, chunk: pd.DataFrame):
+        self.n_rows += len(chunk)
+
+        for col, edges in self.edges.items():
+            values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=float)
+            valid = values[~np.isnan(values)]
+            self.missing[col] += len(values) - len(valid)
+            self.sums[col] += float(valid.sum())
+            self.bin_counts[col] += np.bincount(
+                np.searchsorted(edges, valid, side="right"), minlength=len(edges) + 1
+            )
+
+        for col, counts in self.cat_counts.items():
+            # Contagem no chunk inteiro; a limpeza de espaços só toca os valores únicos
+            for value, n in chunk[col].value_counts(dropna=False).items():
+                key = str(value).strip()
+                counts[key] = counts.get(key, 0) + int(n)
+
+    def report(self, top: int = 3) -> dict:
+        result = {"n_rows": self.n_rows, "numeric": {}, "categorical": {}}
+
+        for col, ref in self.reference["numeric"].items():
+            counts = self.bin_counts[col]
+            total = counts.sum()
+            actual = counts / total if total else np.zeros_like(counts, dtype=float)
+            expected = np.asarray(ref["proportions"])
+            result["numeric"][col] = {
+                "psi": psi(expected, actual),
+                "ks": ks_distance(expected, actual),
+                "missing_rate": self.missing[col] / self.n_rows if self.n_rows else 0.0,
+                "mean": self.sums[col] / total if total else float("nan"),
+                "reference_mean": ref["mean"],
+            }
+
+        for col, ref in self.reference["categorical"].items():
+            counts = self.cat_counts[col]
+            total = sum(counts.values())
+            categories = sorted(set(ref) | set(counts))
+            expected = np.array([ref.get(c, 0.0) for c in categories])
+            actual = np.array([counts.get(c, 0) / total if total else 0.0 for c in categories])
+            shift = actual - expected
+            order = np.argsort(-np.abs(shift))[:top]
+            result["categorical"][col] = {
+                "psi": psi(expected, actual),
+                "unseen_rate": float(sum(actual[i] for i, c in enumerate(categories) if c not in ref)),
+                "top_shifts": {categories[i]: float(shift[i]) for i in order},
+            }
+
+        return result
+
+
+def run(csv_path: str, reference_path: str = REFERENCE_PATH, chunksize: int = CHUNK_SIZE) -> dict:
+    with open(reference_path, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+
+    acc = DriftAccumulator(reference)
+    columns = set(reference["numeric"]) | set(reference["categorical"])
+
+    # Numéricas sem dtype fixo: um chunk com valor inválido ("?") vem como texto
+    # e update() converte para NaN, contando como ausente em vez de abortar a leitura
+    reader = pd.read_csv(
+        csv_path,
+        usecols=lambda c: c.strip() in columns,
+        chunksize=chunksize,
+        dtype={col: "object" for col in reference["categorical"]},
+    )
+    for chunk in reader:
+        chunk.columns = [c.strip() for c in chunk.columns]
+        acc.update(chunk)
+
+    return acc.report()
+
+
+def print_report(report: dict, threshold: float = PSI_ALERT):
+    print(f"Linhas analisadas: {report['n_rows']}")
+
+    print("\n=== Numéricas ===")
+    print(f"{'feature':<16}{'PSI':>8}{'KS':>8}{'ausentes':>10}{'média':>10}{'ref.':>10}")
+    for col, r in report["numeric"].items():
+        flag = "  ⚠️" if r["psi"] > threshold else ""
+        print(f"{col:<16}{r['psi']:>8.3f}{r['ks']:>8.3f}{r['missing_rate']:>10.2%}"
+              f"{r['mean']:>10.2f}{r['reference_mean']:>10.2f}{flag}")
+
+    print("\n=== Categóricas ===")
+    print(f"{'feature':<16}{'PSI':>8}{'novas':>8}  maiores variações")
+    for col, r in report["categorical"].items():
+        flag = "  ⚠️" if r["psi"] > threshold else ""
+        shifts = ", ".join(f"{k} {v:+.1%}" for k, v in r["top_shifts"].items())
+        print(f"{col:<16}{r['psi']:>8.3f}{r['unseen_rate']:>8.1%}  {shifts}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de drift de um CSV contra a base de treino.")
+    parser.add_argument("csv", help="CSV com os novos pacientes (mesmas colunas do treino)")
+    parser.add_argument("--reference", default=REFERENCE_PATH, help="Esboços gerados pelo train.py")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Linhas lidas por vez")
+    parser.add_argument("--threshold", type=float, default=PSI_ALERT, help="PSI a partir do qual sinalizar")
+    parser.add_argument("--output", help="Salvar o relatório completo em JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = run(args.csv, args.reference, args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    print_report(report, args.threshold)
+    print(f"\n⏱️ {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("✅ Relatório salvo em:", args.output)
+
+
+if __name__ == "__main__":
+    main()
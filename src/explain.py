@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OneHotEncoder
+
+CACHE_SIZE = 4096
+
+
+class ForestExplainer:
+    """Contribuição de cada feature original para as probabilidades da floresta.
+
+    Atribuição por caminho de decisão (Saabas): cada divisão percorrida passa a
+    variação da distribuição de classes do nó pai para o filho à feature usada na
+    divisão. Para cada linha, ``bias + contribuições.sum(features)`` reproduz
+    exatamente ``predict_proba``. Os nós de todas as árvores ficam em vetores
+    únicos, então uma chamada processa a floresta inteira e qualquer número de linhas.
+    """
+
+    def __init__(self, pipeline, cache_size: int = CACHE_SIZE):
+        self.prep = pipeline.named_steps["prep"]
+        self.forest = pipeline.named_steps["model"]
+        self.classes_ = self.forest.classes_
+        self.feature_names, column_to_feature = self._feature_mapping(self.prep)
+
+        # Nós de todas as árvores concatenados; filhos já com o deslocamento global
+        left, right, split_col, threshold = [], [], [], []
+        deltas, features, roots, bias = [], [], [], []
+        offset = 0
+        for est in self.forest.estimators_:
+            tree = est.tree_
+            value = tree.value[:, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)
+
+            is_leaf = tree.children_left < 0
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            split_col.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+
+            parent = np.full(tree.node_count, -1)
+            for children in (tree.children_left, tree.children_right):
+                internal = children >= 0
+                parent[children[internal]] = np.flatnonzero(internal)
+
+            delta = np.zeros_like(value)
+            feature = np.zeros(tree.node_count, dtype=np.int64)
+            has_parent = parent >= 0
+            delta[has_parent] = value[has_parent] - value[parent[has_parent]]
+            feature[has_parent] = column_to_feature[tree.feature[parent[has_parent]]]
+
+            deltas.append(delta)
+            features.append(feature)
+            roots.append(offset)
+            bias.append(value[0])
+            offset += tree.node_count
+
+        self._left = np.concatenate(left)
+        self._right = np.concatenate(right)
+        self._split_col = np.concatenate(split_col)
+        self._threshold = np.concatenate(threshold)
+        self._delta = np.concatenate(deltas)
+        self._feature = np.concatenate(features)
+        self._roots = np.asarray(roots)
+        self.bias = np.mean(bias, axis=0)
+
+        # Cache LRU por linha de entrada, compartilhado entre sessões
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _feature_mapping(prep):
+        # Coluna transformada -> índice da feature original (one-hot volta para a categórica)
+        names, mapping = [], []
+        for _, transformer, cols in prep.transformers_:
+            if transformer == "drop" or len(cols) == 0:
+                continue
+            if isinstance(transformer, OneHotEncoder):
+                widths = [len(c) for c in transformer.categories_]
+            else:
+                widths = [1] * len(cols)
+            for col, width in zip(cols, widths):
+                mapping.extend([len(names)] * width)
+                names.append(col)
+        return names, np.asarray(mapping)
+
+    def _compute(self, X: pd.DataFrame) -> np.ndarray:
+        Xt = self.prep.transform(X)
+        if hasattr(Xt, "toarray"):
+            Xt = Xt.toarray()
+        Xt = np.asarray(Xt, dtype=np.float32)  # as árvores comparam em float32
+
+        n_rows, n_feat = len(Xt), len(self.feature_names)
+        n_classes = len(self.classes_)
+        contrib = np.zeros((n_classes, n_rows * n_feat))
+
+        # Desce todas as árvores ao mesmo tempo: um passo por nível de profundidade
+        row = np.repeat(np.arange(n_rows), len(self._roots))
+        node = np.tile(self._roots, n_rows)
+        while len(node):
+            go_left = Xt[row, self._split_col[node]] <= self._threshold[node]
+            node = np.where(go_left, self._left[node], self._right[node])
+
+            idx = row * n_feat + self._feature[node]
+            for k in range(n_classes):
+                contrib[k] += np.bincount(idx, weights=self._delta[node, k], minlength=n_rows * n_feat)
+
+            internal = self._left[node] >= 0
+            row, node = row[internal], node[internal]
+
+        contrib = contrib.reshape(n_classes, n_rows, n_feat).transpose(1, 2, 0)
+        return contrib / len(self._roots)
+
+    def explain(self, X: pd.DataFrame) -> np.ndarray:
+        """Contribuições com forma (linhas, features, classes); aceita lotes."""
+        keys = [tuple(r) for r in X.itertuples(index=False, name=None)]
+        result = np.empty((len(keys), len(self.feature_names), len(self.classes_)))
+
+        missing = []
+        with self._lock:
+            for i, k in enumerate(keys):
+                if k in self._cache:
+                    self._cache.move_to_end(k)
+                    result[i] = self._cache[k]
+                else:
+                    missing.append(i)
+
+        if missing:
+            result[missing] = self._compute(X.iloc[missing])
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = result[i].copy()  # sem prender o lote inteiro na memória
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        return result
+
+    def explain_class(self, row: pd.DataFrame, class_label) -> pd.Series:
+        """Contribuições de uma linha para uma classe, ordenadas por magnitude."""
+        k = int(np.flatnonzero(self.classes_ == class_label)[0])
+        contrib = pd.Series(self.explain(row)[0, :, k], index=self.feature_names)
+        return contrib.reindex(contrib.abs().sort_values(ascending=False).index)
@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import secrets
+import tempfile
+import argparse
+import subprocess
+import urllib.request
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from audit import AUDIT_DIR_ENV, LOADTEST_TOKEN_ENV
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 8599
+SESSIONS = [1, 2, 4, 8, 16]
+ITERATIONS = 3
+BOOT_TIMEOUT = 120
+RSS_SAMPLES = 10        # leituras de RSS por medição estável (mediana)
+RSS_INTERVAL = 0.1      # segundos entre leituras de RSS
+RSS_TOLERANCE = 1.0     # MB: queda menor que isso conta como RSS estável
+PRIMER_ROUNDS = 2       # avaliações mínimas da sessão descartável antes da linha de base
+PRIMER_MAX_ROUNDS = 10  # limite de avaliações enquanto a RSS ainda cai
+
+GENDERS = ["Mulher", "Homem"]
+YESNO = ["Sim", "Não"]
+FREQ = ["Não", "Ocasionalmente", "Frequentemente", "Sempre"]
+MTRANS = ["Transporte Público", "Caminhada", "Automóvel", "Motocicleta", "Bicicleta"]
+
+FINISHED_OK = (
+    ForwardMsg.ScriptFinishedStatus.FINISHED_SUCCESSFULLY,
+    ForwardMsg.ScriptFinishedStatus.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+)
+
+
+# ===================== SERVIDOR =====================
+def start_server(port: int, token: str, audit_dir: str):
+    # Mesmo boot de produção (startup.py): aquece o modelo antes de aceitar sessões.
+    # As sessões simuladas não são pacientes: o token as tira da auditoria e, por
+    # garantia, o servidor grava a auditoria num diretório temporário
+    env = dict(os.environ, **{LOADTEST_TOKEN_ENV: token, AUDIT_DIR_ENV: audit_dir})
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SRC_DIR, "startup.py"), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    deadline = time.monotonic() + BOOT_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"Servidor não respondeu em {BOOT_TIMEOUT}s na porta {port}")
+
+
+def process_stats(pid):
+    # RSS (MB) e CPU acumulada (s) do processo do servidor, via /proc (Linux)
+    if pid is None:
+        return None, None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return rss_kb / 1024, cpu
+    except OSError:
+        return None, None
+
+
+# ===================== SESSÃO SIMULADA =====================
+class SimulatedSession:
+    """Um clínico no navegador: fala o protocolo do Streamlit pelo websocket.
+
+    Cada rerun envia o estado de todos os widgets (como o frontend faz) e mede o
+    tempo até ``script_finished``. Com ``token``, a URL leva ``?loadtest=<token>``
+    e o app não grava as avaliações simuladas na auditoria.
+    """
+
+    def __init__(self, url: str, seed: int, token: str = None):
+        self.url = url
+        self.query_string = f"loadtest={token}" if token else ""
+        self.rng = np.random.default_rng(seed)
+        self.ws = None
+        self.widgets = {}   # chave do widget (ou rótulo, para botões sem chave) -> id
+        self.states = {}    # id -> WidgetState com o valor atual
+        self.latencies = []
+        self.errors = 0
+
+    def reset(self):
+        # Cada nível mede só os próprios reruns; o estado da sessão no servidor continua
+        self.latencies = []
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _register(self, element):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors += 1
+            return
+        proto = getattr(element, kind)
+        widget_id = getattr(proto, "id", "")
+        if isinstance(widget_id, str) and widget_id.startswith("$$ID-"):
+            key = widget_id.rsplit("-", 1)[1]
+            if key == "None":
+                key = getattr(proto, "label", "")  # botões sem key: localizados pelo rótulo
+            self.widgets[key] = widget_id
+
+    async def rerun(self, triggers=()):
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        for text in triggers:
+            msg.rerun_script.widget_states.widgets.append(
+                WidgetState(id=self._button(text), trigger_value=True)
+            )
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await self.ws.recv())
+            kind = fm.WhichOneof("type")
+            if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                self._register(fm.delta.new_element)
+            elif kind == "script_finished":
+                if fm.script_finished == ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if fm.script_finished not in FINISHED_OK:
+                    self.errors += 1
+                break
+        self.latencies.append(time.perf_counter() - start)
+
+    def _button(self, text):
+        return next(wid for label, wid in self.widgets.items() if text in label)
+
+    def _set(self, key, **value):
+        widget_id = self.widgets[key]
+        self.states[widget_id] = WidgetState(id=widget_id, **value)
+
+    def fill_form(self):
+        rng = self.rng
+        self._set("gender", string_value=str(rng.choice(GENDERS)))
+        self._set("age", double_value=float(rng.integers(16, 70)))
+        self._set("height", double_value=round(float(rng.uniform(1.50, 1.95)), 2))
+        self._set("weight", double_value=round(float(rng.uniform(45, 150)), 1))
+        for key in ["family_history", "favc", "smoke", "scc"]:
+            self._set(key, string_value=str(rng.choice(YESNO)))
+        for key in ["caec", "calc"]:
+            self._set(key, string_value=str(rng.choice(FREQ)))
+        self._set("mtrans", string_value=str(rng.choice(MTRANS)))
+        for key, values in [("faf", np.arange(0, 4.5, 0.5)), ("ch2o", np.arange(1, 3.5, 0.5))]:
+            widget_id = self.widgets[key]
+            ws = WidgetState(id=widget_id)
+            ws.double_array_value.data[:] = [float(rng.choice(values))]
+            self.states[widget_id] = ws
+
+    async def evaluate(self):
+        self.fill_form()
+        await self.rerun()
+        await self.rerun(triggers=["EXECUTAR"])
+        await self.rerun(triggers=["Dashboard"])  # abre o dashboard
+        await self.rerun(triggers=["Dashboard"])  # fecha
+
+    async def run(self, iterations: int):
+        await self.rerun()  # primeira carga da página
+        for _ in range(iterations):
+            await self.evaluate()
+
+
+# ===================== NÍVEIS DE CARGA =====================
+async def settled_rss(pid):
+    # Mediana de várias leituras: uma leitura isolada oscila com o GC e o alocador
+    values = []
+    for _ in range(RSS_SAMPLES):
+        rss, _ = process_stats(pid)
+        if rss is None:
+            return None
+        values.append(rss)
+        await asyncio.sleep(RSS_INTERVAL)
+    return float(np.median(values))
+
+
+async def peak_rss(pid, stop: asyncio.Event):
+    peak = None
+    while not stop.is_set():
+        rss, _ = process_stats(pid)
+        if rss is not None:
+            peak = rss if peak is None else max(peak, rss)
+        await asyncio.sleep(RSS_INTERVAL)
+    return peak
+
+
+async def run_level(sessions, iterations: int, pid, baseline) -> dict:
+    for s in sessions:
+        s.reset()
+    _, cpu_before = process_stats(pid)
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(peak_rss(pid, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(s.run(iterations) for s in sessions))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    peak = await sampler
+
+    _, cpu_after = process_stats(pid)
+    # Sessões continuam abertas: o session_state de todas segue em memória
+    rss = await settled_rss(pid)
+
+    n_sessions = len(sessions)
+    latencies = np.concatenate([s.latencies for s in sessions]) * 1000
+    result = {
+        "sessions": n_sessions,
+        "reruns": int(len(latencies)),
+        "errors": int(sum(s.errors for s in sessions)),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "rss_idle_mb": baseline,
+        "rss_mb": rss,
+        "rss_peak_mb": peak,
+        "rss_growth_mb": None,
+        "rss_per_session_mb": None,
+        "cpu_ms_per_rerun": None,
+    }
+    if rss is not None and baseline is not None:
+        result["rss_growth_mb"] = rss - baseline
+        result["rss_per_session_mb"] = (rss - baseline) / n_sessions
+        result["cpu_ms_per_rerun"] = (cpu_after - cpu_before) / len(latencies) * 1000
+    return result
+
+
+def fmt(value, spec: str, width: int) -> str:
+    return format(value, spec) if value is not None else "-".rjust(width)
+
+
+async def prime(url: str, pid, seed: int, token):
+    # O primeiro uso real libera de uma vez a memória descartada no boot (a RSS cai ~50 MB):
+    # uma sessão descartável avalia pacientes até a RSS parar de cair, independente de
+    # --iterations, e a RSS final vira a linha de base do servidor ocioso
+    primer = SimulatedSession(url, seed=seed, token=token)
+    await primer.connect()
+    try:
+        await primer.rerun()
+        rss = await settled_rss(pid)
+        for round_ in range(1, PRIMER_MAX_ROUNDS + 1):
+            await primer.evaluate()
+            previous, rss = rss, await settled_rss(pid)
+            if rss is None:
+                break
+            if round_ >= PRIMER_ROUNDS and rss > previous - RSS_TOLERANCE:
+                break
+    finally:
+        await primer.close()
+    # Sem a sessão descartável: a memória dela não entra na linha de base
+    return await settled_rss(pid)
+
+
+async def run_all(url: str, levels, iterations: int, pid, token=None):
+    baseline = await prime(url, pid, seed=max(levels), token=token)  # semente fora dos níveis
+
+    # Níveis cumulativos: as sessões de um nível continuam abertas no seguinte, e o
+    # crescimento de memória é sempre medido contra o mesmo servidor ocioso
+    print(f"RSS ocioso: {fmt(baseline, '.0f', 1)} MB")
+    print(f"{'N':>3}{'reruns':>8}{'erros':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'CPU/rerun ms':>14}{'RSS MB':>9}{'pico MB':>9}{'ΔRSS MB':>9}{'MB/sessão':>11}")
+
+    results, sessions = [], []
+    try:
+        for n in sorted(set(levels)):
+            new = [SimulatedSession(url, seed=i, token=token) for i in range(len(sessions), n)]
+            await asyncio.gather(*(s.connect() for s in new))
+            sessions.extend(new)
+
+            r = await run_level(sessions, iterations, pid, baseline)
+            results.append(r)
+            print(f"{n:>3}{r['reruns']:>8}{r['errors']:>7}{r['throughput_rps']:>8.1f}{r['p50_ms']:>9.0f}"
+                  f"{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{fmt(r['cpu_ms_per_rerun'], '>14.0f', 14)}"
+                  f"{fmt(r['rss_mb'], '>9.0f', 9)}{fmt(r['rss_peak_mb'], '>9.0f', 9)}"
+                  f"{fmt(r['rss_growth_mb'], '>+9.1f', 9)}{fmt(r['rss_per_session_mb'], '>11.2f', 11)}")
+    finally:
+        await asyncio.gather(*(s.close() for s in sessions))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do app com N sessões simultâneas.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=SESSIONS, help="Níveis de concorrência")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="Avaliações por sessão")
+    parser.add_argument("--port", type=int, default=PORT, help="Porta do servidor iniciado pelo teste")
+    parser.add_argument("--url", help="Usar um servidor já em execução (ex.: http://host:8501)")
+    parser.add_argument("--pid", type=int, help="PID do servidor em --url, para medir RSS e CPU")
+    parser.add_argument("--token", help=f"Token do teste de carga configurado em {LOADTEST_TOKEN_ENV} "
+                                         "no servidor de --url (sem ele, as sessões entram na auditoria)")
+    parser.add_argument("--output", help="Salvar os resultados em JSON")
+    args = parser.parse_args()
+
+    proc, audit_dir = None, None
+    if args.url:
+        base, pid, token = args.url.rstrip("/"), args.pid, args.token
+        if not token:
+            print("⚠️ Sem --token: as avaliações simuladas serão gravadas na auditoria do servidor")
+    else:
+        token, audit_dir = secrets.token_hex(16), tempfile.mkdtemp(prefix="loadtest-audit-")
+        proc = start_server(args.port, token, audit_dir)
+        base, pid = f"http://127.0.0.1:{args.port}", proc.pid
+    ws_url = base.replace("http", "ws", 1) + "/_stcore/stream"
+
+    try:
+        results = asyncio.run(run_all(ws_url, args.sessions, args.iterations, pid, token))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if audit_dir is not None:
+            shutil.rmtree(audit_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print("✅ Resultados salvos em:", args.output)
+
+
+if __name__ == "__main__":
+    main()
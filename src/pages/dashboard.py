@@ -1,19 +1,18 @@
+import os
+import time
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 
+import telemetry
+
 st.set_page_config(page_title="Dashboard Analítico - Obesidade", layout="wide")
 
-# ==============================
-# LOAD DATA
-# ==============================
-@st.cache_data
-def load_data():
-    df = pd.read_csv("data/obesity.csv")
-    df.columns = [c.strip() for c in df.columns]
-    return df
+inicio_pagina = time.perf_counter()
 
-df = load_data()
+DATA_PATH = "data/obesity.csv"
 
 # ==============================
 # DICIONÁRIOS DE TRADUÇÃO
@@ -60,10 +59,6 @@ traducao_valores = {
     "Obesity_Type_III": "Obesidade III",
 }
 
-# Aplicar tradução
-df = df.replace(traducao_valores)
-df = df.rename(columns=traducao_colunas)
-
 # ==============================
 # AJUSTES NUMÉRICOS (ARREDONDAMENTOS)
 # ==============================
@@ -75,10 +70,6 @@ colunas_arredondar = [
     "Tempo de Uso de Dispositivos"
 ]
 
-for col in colunas_arredondar:
-    if col in df.columns:
-        df[col] = df[col].round().astype(int)
-
 # ==============================
 # ORDEM DOS NÍVEIS DE OBESIDADE
 # ==============================
@@ -92,11 +83,89 @@ ordem_obesidade = [
     "Obesidade III"
 ]
 
-df["Nível de Obesidade"] = pd.Categorical(
-    df["Nível de Obesidade"],
-    categories=ordem_obesidade,
-    ordered=True
-)
+# ==============================
+# LOAD DATA
+# ==============================
+# Todos os caches abaixo recebem a versão dos dados (mtime do CSV) e o estado do
+# filtro: um widget só recalcula os gráficos que dependem dele.
+@st.cache_data
+def load_data(versao):
+    df = pd.read_csv(DATA_PATH)
+    df.columns = [c.strip() for c in df.columns]
+
+    # Aplicar tradução
+    df = df.replace(traducao_valores)
+    df = df.rename(columns=traducao_colunas)
+
+    for col in colunas_arredondar:
+        if col in df.columns:
+            df[col] = df[col].round().astype(int)
+
+    df["Nível de Obesidade"] = pd.Categorical(
+        df["Nível de Obesidade"],
+        categories=ordem_obesidade,
+        ordered=True
+    )
+    return df
+
+@st.cache_data
+def filtrar(versao, generos):
+    df = load_data(versao)
+    return df[df["Gênero"].isin(generos)]
+
+versao_dados = os.path.getmtime(DATA_PATH)
+
+# ==============================
+# GRÁFICOS (CACHE POR GRÁFICO)
+# ==============================
+@st.cache_data
+def fig_distribuicao(versao, generos):
+    return px.histogram(
+        filtrar(versao, generos),
+        x="Nível de Obesidade",
+        color="Nível de Obesidade"
+    )
+
+@st.cache_data
+def fig_genero(versao, generos):
+    return px.histogram(
+        filtrar(versao, generos),
+        x="Nível de Obesidade",
+        color="Gênero",
+        barmode="group"
+    )
+
+@st.cache_data
+def fig_box(versao, generos, coluna):
+    return px.box(
+        filtrar(versao, generos),
+        x="Nível de Obesidade",
+        y=coluna,
+        color="Nível de Obesidade"
+    )
+
+@st.cache_data
+def fig_contagem(versao, generos, coluna):
+    contagem = (
+        filtrar(versao, generos)
+        .groupby(["Nível de Obesidade", coluna], observed=False)
+        .size()
+        .reset_index(name="Quantidade")
+    )
+    return px.bar(
+        contagem,
+        x="Nível de Obesidade",
+        y="Quantidade",
+        color=coluna,
+        barmode="group"
+    )
+
+@st.cache_data
+def insights(versao, generos):
+    df = filtrar(versao, generos)
+    mean_faf = df.groupby("Nível de Obesidade", observed=True)["Frequência de Atividade Física"].mean().sort_values()
+    mean_tue = df.groupby("Nível de Obesidade", observed=True)["Tempo de Uso de Dispositivos"].mean().sort_values(ascending=False)
+    return mean_faf.index[0], mean_tue.index[0]
 
 # ==============================
 # TÍTULO
@@ -109,13 +178,15 @@ st.markdown("Análise exploratória para apoio estratégico à equipe médica.")
 # ==============================
 st.sidebar.header("Filtros")
 
+opcoes_genero = load_data(versao_dados)["Gênero"].unique()
 gender_filter = st.sidebar.multiselect(
     "Gênero",
-    options=df["Gênero"].unique(),
-    default=df["Gênero"].unique()
+    options=opcoes_genero,
+    default=opcoes_genero
 )
 
-df = df[df["Gênero"].isin(gender_filter)]
+generos = tuple(sorted(gender_filter))
+df = filtrar(versao_dados, generos)
 
 # ==============================
 # MÉTRICAS
@@ -132,98 +203,135 @@ st.divider()
 # DISTRIBUIÇÃO
 # ==============================
 st.subheader("Distribuição dos Níveis de Obesidade")
-
-fig_dist = px.histogram(
-    df,
-    x="Nível de Obesidade",
-    color="Nível de Obesidade"
-)
-
-st.plotly_chart(fig_dist, use_container_width=True)
+st.plotly_chart(fig_distribuicao(versao_dados, generos), use_container_width=True)
 
 # ==============================
 # GÊNERO X OBESIDADE
 # ==============================
 st.subheader("Nível de Obesidade por Gênero")
-
-fig_gender = px.histogram(
-    df,
-    x="Nível de Obesidade",
-    color="Gênero",
-    barmode="group"
-)
-
-st.plotly_chart(fig_gender, use_container_width=True)
+st.plotly_chart(fig_genero(versao_dados, generos), use_container_width=True)
 
 # ==============================
 # ATIVIDADE FÍSICA
 # ==============================
 st.subheader("Atividade Física x Nível de Obesidade")
-
-fig_faf = px.box(
-    df,
-    x="Nível de Obesidade",
-    y="Frequência de Atividade Física",
-    color="Nível de Obesidade"
-)
-
-st.plotly_chart(fig_faf, use_container_width=True)
+st.plotly_chart(fig_box(versao_dados, generos, "Frequência de Atividade Física"), use_container_width=True)
 
 # ==============================
 # TEMPO DE TELA
 # ==============================
 st.subheader("Tempo de Tela x Nível de Obesidade")
-
-fig_tue = px.box(
-    df,
-    x="Nível de Obesidade",
-    y="Tempo de Uso de Dispositivos",
-    color="Nível de Obesidade"
-)
-
-st.plotly_chart(fig_tue, use_container_width=True)
+st.plotly_chart(fig_box(versao_dados, generos, "Tempo de Uso de Dispositivos"), use_container_width=True)
 
 # ==============================
 # CONSUMO CALÓRICO
 # ==============================
 st.subheader("Consumo de Alimentos Altamente Calóricos")
-
-favc_counts = (
-    df.groupby(["Nível de Obesidade", "Consumo Frequente de Alimentos Calóricos"])
-    .size()
-    .reset_index(name="Quantidade")
+st.plotly_chart(
+    fig_contagem(versao_dados, generos, "Consumo Frequente de Alimentos Calóricos"),
+    use_container_width=True,
 )
 
-fig_favc = px.bar(
-    favc_counts,
-    x="Nível de Obesidade",
-    y="Quantidade",
-    color="Consumo Frequente de Alimentos Calóricos",
-    barmode="group"
-)
-
-st.plotly_chart(fig_favc, use_container_width=True)
-
 # ==============================
 # TRANSPORTE
 # ==============================
 st.subheader("Meio de Transporte x Nível de Obesidade")
+st.plotly_chart(fig_contagem(versao_dados, generos, "Meio de Transporte"), use_container_width=True)
 
-transport_counts = (
-    df.groupby(["Nível de Obesidade", "Meio de Transporte"])
-    .size()
-    .reset_index(name="Quantidade")
-)
+# ==============================
+# DENSIDADE 2-D (IDADE, ALTURA, PESO)
+# ==============================
+colunas_continuas = ["Idade", "Altura (m)", "Peso (kg)"]
 
-fig_transport = px.bar(
-    transport_counts,
-    x="Nível de Obesidade",
-    y="Quantidade",
-    color="Meio de Transporte",
-    barmode="group"
-)
+# A contagem é feita no servidor sobre uma grade fixa de células: o navegador
+# recebe apenas níveis x bins x bins valores, independentemente do número de linhas.
+@st.cache_data
+def grade_densidade(versao, generos, col_x, col_y, faixa_x, faixa_y, bins):
+    df = filtrar(versao, generos)
+    x = df[col_x].to_numpy(dtype=float)
+    y = df[col_y].to_numpy(dtype=float)
+    nivel = df["Nível de Obesidade"].cat.codes.to_numpy(dtype=np.int64)
+
+    dentro = (
+        (x >= faixa_x[0]) & (x <= faixa_x[1])
+        & (y >= faixa_y[0]) & (y <= faixa_y[1])
+        & (nivel >= 0)
+    )
+    x, y, nivel = x[dentro], y[dentro], nivel[dentro]
+
+    largura_x = (faixa_x[1] - faixa_x[0]) / bins or 1.0
+    largura_y = (faixa_y[1] - faixa_y[0]) / bins or 1.0
+    ix = np.minimum(((x - faixa_x[0]) / largura_x).astype(np.int64), bins - 1)
+    iy = np.minimum(((y - faixa_y[0]) / largura_y).astype(np.int64), bins - 1)
+
+    n_niveis = len(ordem_obesidade)
+    contagem = np.bincount(
+        (nivel * bins + iy) * bins + ix,
+        minlength=n_niveis * bins * bins,
+    ).reshape(n_niveis, bins, bins)
+
+    centros_x = faixa_x[0] + (np.arange(bins) + 0.5) * largura_x
+    centros_y = faixa_y[0] + (np.arange(bins) + 0.5) * largura_y
+    return contagem, centros_x, centros_y
 
-st.plotly_chart(fig_transport, use_container_width=True)
+@st.cache_data
+def fig_densidade(versao, generos, col_x, col_y, faixa_x, faixa_y, bins):
+    contagem, centros_x, centros_y = grade_densidade(versao, generos, col_x, col_y, faixa_x, faixa_y, bins)
+    fig = px.imshow(
+        contagem,
+        x=centros_x,
+        y=centros_y,
+        facet_col=0,
+        facet_col_wrap=4,
+        origin="lower",
+        aspect="auto",
+        color_continuous_scale="Blues",
+        labels={"x": col_x, "y": col_y, "color": "Pacientes"},
+    )
+    fig.for_each_annotation(
+        lambda a: a.update(text=ordem_obesidade[int(a.text.split("=")[-1])])
+    )
+    fig.update_layout(height=550)
+    return fig
+
+@st.cache_data
+def limites(versao, generos, coluna):
+    serie = filtrar(versao, generos)[coluna]
+    if serie.empty:
+        return 0.0, 1.0
+    return float(serie.min()), float(serie.max())
+
+# Fragmento: eixos, resolução e zoom reexecutam só esta seção
+@st.fragment
+def secao_densidade(versao, generos):
+    inicio = time.perf_counter()
+    st.subheader("Densidade de Medidas Antropométricas por Nível de Obesidade")
+
+    col_eixo_x, col_eixo_y, col_bins = st.columns(3)
+    eixo_x = col_eixo_x.selectbox("Eixo X", colunas_continuas, index=0)
+    eixo_y = col_eixo_y.selectbox(
+        "Eixo Y", [c for c in colunas_continuas if c != eixo_x], index=1 if eixo_x == "Idade" else 0
+    )
+    bins = col_bins.select_slider("Resolução (células por eixo)", options=[20, 30, 40, 60, 80], value=40)
+
+    # Reduzir a faixa funciona como zoom: a grade mantém o mesmo número de células,
+    # então a resolução de cada célula acompanha a janela visível.
+    min_x, max_x = limites(versao, generos, eixo_x)
+    min_y, max_y = limites(versao, generos, eixo_y)
+    col_zoom_x, col_zoom_y = st.columns(2)
+    faixa_x = col_zoom_x.slider(f"Faixa de {eixo_x}", min_x, max_x, (min_x, max_x))
+    faixa_y = col_zoom_y.slider(f"Faixa de {eixo_y}", min_y, max_y, (min_y, max_y))
+
+    st.plotly_chart(
+        fig_densidade(versao, generos, eixo_x, eixo_y, faixa_x, faixa_y, bins),
+        use_container_width=True,
+    )
+
+    duracao = time.perf_counter() - inicio
+    telemetry.record("dashboard.densidade", duracao)
+    st.caption(f"⏱️ Seção recalculada em {duracao * 1000:.0f} ms no servidor")
+
+secao_densidade(versao_dados, generos)
 
 # ==============================
 # INSIGHTS AUTOMÁTICOS
@@ -231,15 +339,17 @@ st.plotly_chart(fig_transport, use_container_width=True)
 st.divider()
 st.subheader("🔎 Principais Insights Observados")
 
-mean_faf = df.groupby("Nível de Obesidade")["Frequência de Atividade Física"].mean().sort_values()
-mean_tue = df.groupby("Nível de Obesidade")["Tempo de Uso de Dispositivos"].mean().sort_values(ascending=False)
+menor_faf, maior_tue = insights(versao_dados, generos)
 
 st.markdown("### 📌 Padrões Identificados:")
 
-st.write(f"- O nível com menor média de atividade física é **{mean_faf.index[0]}**.")
-st.write(f"- O nível com maior tempo médio de uso de dispositivos é **{mean_tue.index[0]}**.")
+st.write(f"- O nível com menor média de atividade física é **{menor_faf}**.")
+st.write(f"- O nível com maior tempo médio de uso de dispositivos é **{maior_tue}**.")
 st.write("- Observa-se tendência de maior prevalência de obesidade em indivíduos com menor prática de atividade física.")
 st.write("- O consumo frequente de alimentos altamente calóricos apresenta associação com níveis mais elevados de obesidade.")
 
 st.divider()
+duracao_pagina = time.perf_counter() - inicio_pagina
+telemetry.record("dashboard.pagina", duracao_pagina)
+st.caption(f"⏱️ Página montada em {duracao_pagina * 1000:.0f} ms no servidor")
 st.caption("Painel desenvolvido para análise estratégica e apoio à tomada de decisão médica.")
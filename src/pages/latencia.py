@@ -0,0 +1,95 @@
+import pandas as pd
+import streamlit as st
+
+import startup
+import telemetry
+
+st.set_page_config(page_title="Latência - Predição de Obesidade", layout="wide")
+
+
+@st.cache_resource(show_spinner=False)
+def custo_span() -> float:
+    # Medido uma vez por processo: 10k spans disputam o lock usado pelas predições
+    return telemetry.span_cost()
+
+
+# ==============================
+# TÍTULO
+# ==============================
+st.title("⏱️ Latência do Fluxo de Predição")
+st.markdown("Percentis por etapa, calculados sobre as execuções mais recentes deste servidor.")
+
+# ==============================
+# PERCENTIS POR ETAPA
+# ==============================
+resumo = telemetry.percentiles()
+
+if not resumo:
+    st.info("Nenhuma avaliação registrada ainda. Execute uma predição na página principal.")
+else:
+    tabela = pd.DataFrame.from_dict(resumo, orient="index")
+    tabela.index.name = "Etapa"
+    for col in ["p50", "p95", "p99"]:
+        tabela[col] = tabela[col] * 1000  # segundos -> milissegundos
+
+    tabela = tabela.rename(columns={
+        "count": "Execuções",
+        "p50": "p50 (ms)",
+        "p95": "p95 (ms)",
+        "p99": "p99 (ms)",
+    })
+
+    st.dataframe(tabela.style.format(precision=2), use_container_width=True)
+
+    st.subheader("Distribuição por Etapa")
+    st.bar_chart(tabela[["p50 (ms)", "p95 (ms)", "p99 (ms)"]])
+
+    # Custo da própria instrumentação frente ao p50 de uma predição completa
+    total = resumo.get("predict.total")
+    if total is not None:
+        spans = sum(1 for etapa in resumo if etapa.startswith("predict."))
+        custo = custo_span()
+        st.caption(
+            f"Overhead da instrumentação: {spans} spans × {custo * 1e6:.1f} µs = "
+            f"{spans * custo / total['p50'] * 100:.3f}% do p50 da predição "
+            f"({total['p50'] * 1000:.0f} ms)."
+        )
+
+# ==============================
+# INICIALIZAÇÃO
+# ==============================
+st.divider()
+st.subheader("🚀 Inicialização do Servidor")
+
+perfil = startup.load_profile()
+if perfil is None:
+    st.info("Sem perfil de inicialização. Inicie o servidor com `python src/startup.py`.")
+else:
+    fases = perfil["phases_ms"]
+    ttfp = fases["time_to_first_prediction"]
+    col_ttfp, col_meta = st.columns(2)
+    col_ttfp.metric("Tempo até a primeira predição", f"{ttfp:.0f} ms")
+    col_meta.metric(
+        "Meta",
+        f"{perfil['target_ms']:.0f} ms",
+        delta="dentro da meta" if perfil["within_target"] else "acima da meta",
+        delta_color="normal" if perfil["within_target"] else "inverse",
+    )
+    st.bar_chart(pd.Series(
+        {k: v for k, v in fases.items() if k != "time_to_first_prediction"},
+        name="ms",
+    ))
+    st.caption(f"Registrado em {perfil['recorded_at']}")
+
+# ==============================
+# EXPORTAÇÃO PROMETHEUS
+# ==============================
+st.divider()
+st.subheader("Exportação (formato Prometheus)")
+
+if st.button("💾 Exportar agora"):
+    caminho = telemetry.export()
+    st.success(f"Métricas salvas em `{caminho}`")
+
+with st.expander("Ver texto exportado"):
+    st.code(telemetry.render_prometheus(), language="text")
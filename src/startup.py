@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import urllib.request
+
+_PROCESS_START = time.perf_counter()
+
+import telemetry
+
+MODEL_PATH = os.path.join("models", "obesity_model.joblib")
+DATA_PATH = os.path.join("data", "obesity.csv")
+PROFILE_PATH = os.path.join("models", "startup_profile.json")
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+WARMUP_ROWS = 64
+TARGET_MS = 5000.0
+SERVER_TIMEOUT = 120.0
+
+# Artefatos carregados uma única vez por processo; o app reutiliza o que o boot já preparou
+_lock = threading.Lock()
+_model = None
+_model_version = None
+_explainer = None
+_explainer_ready = False
+
+
+def get_model():
+    global _model
+    with _lock:
+        if _model is None:
+            import joblib
+            with telemetry.span("load_model"):
+                _model = joblib.load(MODEL_PATH)
+        return _model
+
+
+def get_model_version():
+    # Impressão digital do artefato: identifica o modelo em cada registro de auditoria
+    global _model_version
+    with _lock:
+        if _model_version is None:
+            digest = hashlib.sha256()
+            with open(MODEL_PATH, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            _model_version = digest.hexdigest()[:12]
+        return _model_version
+
+
+def get_explainer():
+    # Só a floresta tem atribuição por caminho de decisão
+    global _explainer, _explainer_ready
+    model = get_model()
+    with _lock:
+        if not _explainer_ready:
+            if hasattr(model.named_steps["model"], "estimators_"):
+                from explain import ForestExplainer
+                with telemetry.span("load_explainer"):
+                    _explainer = ForestExplainer(model)
+            _explainer_ready = True
+        return _explainer
+
+
+def warm_up(rows: int = WARMUP_ROWS) -> dict:
+    """Importa, carrega e executa o fluxo de predição, medindo cada fase (ms)."""
+    profile = {}
+
+    def phase(name, start):
+        profile[name] = (time.perf_counter() - start) * 1000
+
+    # Conta desde o início do processo: inclui o numpy já importado pelo telemetry
+    start = _PROCESS_START
+    import pandas as pd
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.compose  # noqa: F401
+    import joblib  # noqa: F401
+    phase("imports_ml", start)
+
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    import plotly.express  # noqa: F401
+    phase("imports_ui", start)
+
+    start = time.perf_counter()
+    model = get_model()
+    phase("deserialize_model", start)
+
+    start = time.perf_counter()
+    get_model_version()
+    phase("model_fingerprint", start)
+
+    start = time.perf_counter()
+    explainer = get_explainer()
+    phase("build_explainer", start)
+
+    # Primeira inferência: exatamente as etapas do botão de avaliação
+    batch = pd.read_csv(DATA_PATH, nrows=rows)
+    batch.columns = [c.strip() for c in batch.columns]
+    features = batch[[c for c in batch.columns if c in model.feature_names_in_]]
+    estimator = model.named_steps["model"]
+
+    start = time.perf_counter()
+    estimator.predict_proba(model.named_steps["prep"].transform(features.iloc[[0]]))
+    if explainer is not None:
+        explainer.explain(features.iloc[[0]])
+    phase("first_inference", start)
+
+    start = time.perf_counter()
+    estimator.predict_proba(model.named_steps["prep"].transform(features))
+    if explainer is not None:
+        explainer.explain(features)
+    phase("warmup_batch", start)
+
+    start = time.perf_counter()
+    estimator.predict_proba(model.named_steps["prep"].transform(features.iloc[[1]]))
+    phase("warm_inference", start)
+
+    first_session(profile)
+
+    # Os spans predict.* da sessão de aquecimento não são predições reais: ficam fora
+    # dos percentis da página Latência, só as fases startup.* entram no registro
+    telemetry.reset()
+    for name, ms in profile.items():
+        telemetry.record(f"startup.{name}", ms / 1000)
+    return profile
+
+
+def first_session(profile: dict) -> dict:
+    """Executa o app.py como a primeira sessão: carga da página e clique em avaliar."""
+    from streamlit.testing.v1 import AppTest
+
+    def phase(name, start):
+        profile[name] = (time.perf_counter() - start) * 1000
+
+    session = AppTest.from_file(APP_PATH, default_timeout=SERVER_TIMEOUT)
+    session.session_state["warmup"] = True  # o app não grava auditoria desta sessão
+
+    start = time.perf_counter()
+    session.run()
+    phase("first_session_page_load", start)
+
+    start = time.perf_counter()
+    next(b for b in session.button if "EXECUTAR" in b.label).click().run()
+    phase("first_session_predict", start)
+    if session.exception:
+        raise RuntimeError(f"Falha na sessão de aquecimento: {session.exception[0].message}")
+
+    # Boot inteiro com uma carga de página e uma avaliação, cada uma contada uma vez;
+    # no modo servidor, watch_server soma a abertura da porta
+    profile["time_to_first_prediction"] = (time.perf_counter() - _PROCESS_START) * 1000
+    return profile
+
+
+def watch_server(profile: dict, port: int, target_ms: float):
+    # Roda em paralelo ao bootstrap: soma o tempo até o servidor responder e regrava o perfil
+    start = time.perf_counter()
+    url = f"http://127.0.0.1:{port}/_stcore/health"
+    while time.perf_counter() - start < SERVER_TIMEOUT:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        print(f"⚠️ Servidor não respondeu em {SERVER_TIMEOUT:.0f}s; perfil sem server_start")
+        return
+
+    profile["server_start"] = (time.perf_counter() - start) * 1000
+    profile["time_to_first_prediction"] += profile["server_start"]
+    telemetry.record("startup.server_start", profile["server_start"] / 1000)
+    data = save_profile(profile, target_ms=target_ms)
+    report(profile, data, target_ms)
+
+
+def save_profile(profile: dict, path: str = PROFILE_PATH, target_ms: float = TARGET_MS):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {
+        "phases_ms": profile,
+        "target_ms": target_ms,
+        "within_target": profile["time_to_first_prediction"] <= target_ms,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return data
+
+
+def report(profile: dict, data: dict, target_ms: float):
+    print("=== Perfil de inicialização (ms) ===")
+    for name, ms in profile.items():
+        print(f"{name:<26}{ms:>10.1f}")
+    status = "✅ dentro" if data["within_target"] else "⚠️ acima"
+    print(f"\n{status} da meta de {target_ms:.0f} ms até a primeira predição")
+
+
+def load_profile(path: str = PROFILE_PATH):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Boot com aquecimento do modelo antes de servir o app.")
+    parser.add_argument("--profile-only", action="store_true",
+                        help="Só mede a inicialização; sai com erro se a meta não for atingida")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS,
+                        help="Meta de tempo até a primeira predição (ms)")
+    parser.add_argument("--port", type=int, help="Porta do servidor Streamlit")
+    args = parser.parse_args()
+
+    profile = warm_up()
+
+    if args.profile_only:
+        # Sem servidor: mede tudo menos a abertura da porta
+        data = save_profile(profile, target_ms=args.target_ms)
+        report(profile, data, args.target_ms)
+        sys.exit(0 if data["within_target"] else 1)
+
+    # Servidor no mesmo processo: as sessões encontram modelo e explicador já carregados
+    from streamlit import config
+    from streamlit.web import bootstrap
+    flags = {"server.port": args.port} if args.port else {}
+    bootstrap.load_config_options(flag_options=flags)
+    threading.Thread(
+        target=watch_server,
+        args=(profile, config.get_option("server.port"), args.target_ms),
+        name="startup-profile",
+        daemon=True,
+    ).start()
+    bootstrap.run(APP_PATH, False, [], flags)
+
+
+if __name__ == "__main__":
+    # O app faz "import startup": registra este módulo para ele ver o estado já aquecido
+    sys.modules.setdefault("startup", sys.modules[__name__])
+    main()
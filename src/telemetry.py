@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# ===================== CONFIGURAÇÃO =====================
+# Limites dos buckets (segundos) no formato de histograma do Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Quantidade de amostras recentes mantidas por etapa para os percentis
+WINDOW = 2048
+
+METRIC_NAME = "obesity_stage_seconds"
+EXPORT_PATH = os.path.join("models", "latency.prom")
+EXPORT_INTERVAL = 10.0
+
+
+class _Stage:
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # último = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=WINDOW)
+
+
+# Registro único por processo: compartilhado entre sessões e páginas do Streamlit
+_stages = {}
+_lock = threading.Lock()
+_last_export = 0.0
+
+
+def record(stage: str, seconds: float):
+    with _lock:
+        st = _stages.get(stage)
+        if st is None:
+            st = _stages[stage] = _Stage()
+        st.counts[bisect_left(BUCKETS, seconds)] += 1
+        st.total += seconds
+        st.count += 1
+        st.recent.append(seconds)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def percentiles(qs=(50, 95, 99)) -> dict:
+    with _lock:
+        snapshot = {name: (st.count, list(st.recent)) for name, st in _stages.items()}
+
+    summary = {}
+    for name, (count, recent) in sorted(snapshot.items()):
+        values = np.percentile(recent, qs) if recent else [float("nan")] * len(qs)
+        summary[name] = {"count": count, **{f"p{q}": float(v) for q, v in zip(qs, values)}}
+    return summary
+
+
+def render_prometheus() -> str:
+    lines = [
+        f"# HELP {METRIC_NAME} Latência por etapa do fluxo de predição.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    with _lock:
+        for name, st in sorted(_stages.items()):
+            cumulative = 0
+            for le, n in zip(BUCKETS + ("+Inf",), st.counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {st.total}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {st.count}')
+    return "\n".join(lines) + "\n"
+
+
+def export(path: str = EXPORT_PATH) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)  # troca atômica para o coletor nunca ler arquivo parcial
+    return path
+
+
+def export_if_due(path: str = EXPORT_PATH, interval: float = EXPORT_INTERVAL):
+    # Evita escrever em disco a cada clique: no máximo uma exportação por intervalo
+    global _last_export
+    now = time.monotonic()
+    if now - _last_export < interval:
+        return None
+    _last_export = now
+    return export(path)
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def span_cost(n: int = 10_000) -> float:
+    # Custo médio (s) de um span vazio, medido numa etapa descartável
+    stage = "_telemetry.overhead"
+    start = time.perf_counter()
+    for _ in range(n):
+        with span(stage):
+            pass
+    cost = (time.perf_counter() - start) / n
+    with _lock:
+        _stages.pop(stage, None)
+    return cost
+
+
+# ===================== BENCHMARK DE OVERHEAD =====================
+def _benchmark(amostras=200, spans_por_predicao=7):
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(os.path.join("models", "obesity_model.joblib"))
+    df = pd.read_csv(os.path.join("data", "obesity.csv"))
+    rows = df.drop(columns=["Obesity"]).sample(amostras, random_state=42)
+
+    tempos = []
+    for i in range(amostras):
+        start = time.perf_counter()
+        model.predict_proba(rows.iloc[i:i + 1])
+        tempos.append(time.perf_counter() - start)
+    p50 = float(np.percentile(tempos, 50))
+
+    custo = span_cost()
+    overhead = custo * spans_por_predicao / p50
+    print(f"Span: {custo * 1e6:.2f}µs | predição p50: {p50 * 1e3:.2f}ms")
+    print(f"Overhead com {spans_por_predicao} spans por predição: {overhead * 100:.3f}%")
+
+
+if __name__ == "__main__":
+    _benchmark()
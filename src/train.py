@@ -1,22 +1,48 @@
+import io
 import os
 import json
+import math
+import time
+import hashlib
+import argparse
+import tempfile
 import joblib
+import numpy as np
 import pandas as pd
 
+from sklearn.base import clone
+from sklearn.frozen import FrozenEstimator
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.neural_network import MLPClassifier
 
 RANDOM_STATE = 42
-
-
-def load_data(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
-
+REFERENCE_BINS = 20
+TARGET = "Obesity"  # ✅ alvo real do seu CSV
+CSV_PATH = os.path.join("data", "obesity.csv")
+
+# Modo em blocos (out-of-core)
+CHUNK_SIZE = 100_000
+EPOCHS = 20
+HOLDOUT_PCT = 20          # % das linhas separadas pelo hash para avaliação
+REFERENCE_SAMPLE = 100_000
+SHUFFLE_BUCKETS_MAX = 512  # arquivos temporários abertos de uma vez no embaralhamento
+HOLDOUT_BINS = 10_000      # resolução do corte por classe no hold-out estratificado
+
+# Análise de importância / poda de features
+IMPORTANCE_CACHE_DIR = os.path.join("models", "importance_cache")
+IMPORTANCE_REPEATS = 5
+SUBSET_SIZES = [12, 8, 6, 4]
+LATENCY_RUNS = 30
+
+
+def clean(df: pd.DataFrame) -> pd.DataFrame:
     # limpeza básica para evitar "bugs de espaço"
     df.columns = [c.strip() for c in df.columns]
     for col in df.select_dtypes(include=["object"]).columns:
@@ -25,6 +51,10 @@ def load_data(csv_path: str) -> pd.DataFrame:
     return df
 
 
+def load_data(csv_path: str) -> pd.DataFrame:
+    return clean(pd.read_csv(csv_path))
+
+
 def build_preprocess(X: pd.DataFrame):
     num_cols = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
     cat_cols = [c for c in X.columns if c not in num_cols]
@@ -51,17 +81,166 @@ def evaluate(model, X_test, y_test, title: str) -> float:
     return acc
 
 
-def main():
-    # Dataset
-    csv_path = os.path.join("data", "obesity.csv")
-    target = "obesity"  # ✅ alvo real do seu CSV
+def build_reference(X: pd.DataFrame, num_cols, cat_cols, n_bins: int = REFERENCE_BINS) -> dict:
+    # Esboços compactos da base de treino, usados pelo drift.py para comparar novos dados
+    reference = {"n_rows": int(len(X)), "numeric": {}, "categorical": {}}
+
+    for col in num_cols:
+        values = X[col].dropna().to_numpy(dtype=float)
+        quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+        edges = np.unique(quantiles)
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        reference["numeric"][col] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+            "missing_rate": float(X[col].isna().mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "mean": float(values.mean()),
+        }
+
+    for col in cat_cols:
+        freq = X[col].value_counts(normalize=True, dropna=False)
+        reference["categorical"][col] = {str(k): float(v) for k, v in freq.items()}
 
+    return reference
+
+
+def check_csv(csv_path: str):
     if not os.path.exists(csv_path):
         raise FileNotFoundError(
             f"Arquivo não encontrado: {csv_path}\n"
             "Coloque o Obesity.csv dentro da pasta data/ com esse nome exato."
         )
 
+
+def save_metrics(metrics: dict) -> str:
+    metrics_path = os.path.join("models", "metrics.json")
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    return metrics_path
+
+
+def save_artifacts(model, metrics: dict, reference: dict):
+    os.makedirs("models", exist_ok=True)
+    model_path = os.path.join("models", "obesity_model.joblib")
+    joblib.dump(model, model_path)
+
+    metrics_path = save_metrics(metrics)
+
+    reference_path = os.path.join("models", "reference.json")
+    with open(reference_path, "w", encoding="utf-8") as f:
+        json.dump(reference, f, ensure_ascii=False, indent=2)
+
+    return model_path, metrics_path, reference_path
+
+
+def model_fingerprint(model_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def feature_importance(model, model_version: str, X_test, y_test) -> dict:
+    # Permutação por feature original (antes do one-hot), em paralelo num pool de processos
+    # (joblib/loky); o resultado fica salvo por versão do modelo.
+    cache_path = os.path.join(IMPORTANCE_CACHE_DIR, f"{model_version}.json")
+    if os.path.exists(cache_path):
+        print("✅ Importâncias em cache:", cache_path)
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    result = permutation_importance(
+        model,
+        X_test,
+        y_test,
+        scoring="accuracy",
+        n_repeats=IMPORTANCE_REPEATS,
+        random_state=RANDOM_STATE,
+        n_jobs=-1,
+    )
+    importances = {
+        col: {"mean": float(m), "std": float(s)}
+        for col, m, s in zip(X_test.columns, result.importances_mean, result.importances_std)
+    }
+    importances = dict(sorted(importances.items(), key=lambda kv: -kv[1]["mean"]))
+
+    os.makedirs(IMPORTANCE_CACHE_DIR, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(importances, f, ensure_ascii=False, indent=2)
+    return importances
+
+
+def benchmark_subset(model, features, X_train, y_train, X_test, y_test) -> dict:
+    # Retreina com o mesmo estimador/hiperparâmetros usando só as features escolhidas
+    preprocess, _, _ = build_preprocess(X_train[features])
+    pipe = Pipeline(steps=[
+        ("prep", preprocess),
+        ("model", clone(model.named_steps["model"])),
+    ])
+
+    start = time.perf_counter()
+    pipe.fit(X_train[features], y_train)
+    train_seconds = time.perf_counter() - start
+
+    acc = accuracy_score(y_test, pipe.predict(X_test[features]))
+
+    row = X_test[features].iloc[[0]]
+    pipe.predict(row)  # primeira chamada fora da medição
+    latencies = []
+    for _ in range(LATENCY_RUNS):
+        start = time.perf_counter()
+        pipe.predict(row)
+        latencies.append(time.perf_counter() - start)
+
+    buffer = io.BytesIO()
+    joblib.dump(pipe, buffer)
+
+    return {
+        "n_features": len(features),
+        "features": list(features),
+        "accuracy": float(acc),
+        "train_seconds": float(train_seconds),
+        "inference_ms_p50": float(np.median(latencies) * 1000),
+        "artifact_mb": buffer.getbuffer().nbytes / 1024 ** 2,
+    }
+
+
+def analyze_features(model, model_path, X_train, y_train, X_test, y_test) -> dict:
+    model_version = model_fingerprint(model_path)
+    importances = feature_importance(model, model_version, X_test, y_test)
+    ranked = list(importances)
+
+    subsets = {"todas": ranked}
+    useful = [c for c in ranked if importances[c]["mean"] > 0]
+    if len(useful) < len(ranked):
+        subsets["importancia_positiva"] = useful
+    for k in SUBSET_SIZES:
+        if k < len(ranked):
+            subsets[f"top_{k}"] = ranked[:k]
+
+    results = {}
+    for name, features in subsets.items():
+        results[name] = benchmark_subset(model, features, X_train, y_train, X_test, y_test)
+        r = results[name]
+        print(f"{name:<22} {r['n_features']:>2} feats | acc {r['accuracy']:.4f} | "
+              f"treino {r['train_seconds']:.1f}s | inferência {r['inference_ms_p50']:.1f}ms | "
+              f"{r['artifact_mb']:.1f}MB")
+
+    return {
+        "model_version": model_version,
+        "permutation_importance": importances,
+        "subsets": results,
+    }
+
+
+def main(csv_path: str = CSV_PATH, analyze: bool = False):
+    # Dataset
+    target = TARGET
+
+    check_csv(csv_path)
     df = load_data(csv_path)
 
     if target not in df.columns:
@@ -150,10 +329,6 @@ def main():
         final_params = {}
 
     # Salvar
-    os.makedirs("models", exist_ok=True)
-    model_path = os.path.join("models", "obesity_model.joblib")
-    joblib.dump(final_model, model_path)
-
     metrics = {
         "final_model": final_name,
         "accuracy": float(final_acc),
@@ -165,19 +340,273 @@ def main():
         "dataset_shape": [int(df.shape[0]), int(df.shape[1])]
     }
 
-    metrics_path = os.path.join("models", "metrics.json")
-    with open(metrics_path, "w", encoding="utf-8") as f:
-        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    model_path, metrics_path, reference_path = save_artifacts(
+        final_model, metrics, build_reference(X_train, num_cols, cat_cols)
+    )
 
     print("\n✅ Modelo final:", final_name)
     print("✅ Accuracy final:", round(final_acc, 4))
     print("✅ Salvo em:", model_path)
     print("✅ Métricas salvas em:", metrics_path)
+    print("✅ Referência para drift salva em:", reference_path)
+
+    if analyze:
+        print("\n=== Importância por permutação e poda de features ===")
+        metrics["feature_analysis"] = analyze_features(
+            final_model, model_path, X_train, y_train, X_test, y_test
+        )
+        save_metrics(metrics)
+        print("✅ Análise de features salva em:", metrics_path)
 
     # Checagem do requisito
     if final_acc < 0.75:
         print("\n⚠️ ALERTA: accuracy < 0.75 (abaixo da meta do desafio).")
 
 
+# ===================== MODO EM BLOCOS (OUT-OF-CORE) =====================
+def read_chunks(csv_path: str, chunksize: int, dtypes=None):
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes):
+        yield clean(chunk)
+
+
+def row_hashes(X: pd.DataFrame) -> np.ndarray:
+    # Hash do conteúdo da linha: a mesma linha cai sempre no mesmo bin, em qualquer passada
+    return pd.util.hash_pandas_object(X, index=False).to_numpy() % HOLDOUT_BINS
+
+
+def holdout_thresholds(hist: dict, pct: int = HOLDOUT_PCT) -> dict:
+    # Por classe, o corte nos bins de hash que deixa ~pct% das linhas no hold-out:
+    # estratificado mesmo para classes raras, e determinístico entre passadas
+    thresholds = {}
+    for label, counts in hist.items():
+        below = np.concatenate([[0], np.cumsum(counts)])  # linhas com bin < t
+        thresholds[label] = int(np.argmin(np.abs(below - counts.sum() * pct / 100)))
+    return thresholds
+
+
+def holdout_mask(X: pd.DataFrame, y: pd.Series, thresholds: dict) -> np.ndarray:
+    return row_hashes(X) < y.map(thresholds).to_numpy()
+
+
+def spill(frames, n_buckets: int, directory: str, prefix: str, rng) -> list:
+    """Distribui as linhas em ``n_buckets`` CSVs sem cabeçalho; devolve (caminho, linhas)."""
+    paths = [os.path.join(directory, f"{prefix}_{k:04d}.csv") for k in range(n_buckets)]
+    rows = np.zeros(n_buckets, dtype=np.int64)
+    files = [open(path, "w", encoding="utf-8", newline="") for path in paths]
+    try:
+        for frame in frames:
+            for k, part in frame.groupby(rng.integers(n_buckets, size=len(frame))):
+                part.to_csv(files[k], header=False, index=False)
+                rows[k] += len(part)
+    finally:
+        for f in files:
+            f.close()
+    return [(path, int(n)) for path, n in zip(paths, rows)]
+
+
+def read_bucket(path: str, columns, dtypes: dict, num_cols, chunksize=None):
+    # Só o vazio das numéricas vira NaN: categóricas voltam como o clean() as deixou ("nan")
+    return pd.read_csv(
+        path, header=None, names=columns, dtype=dtypes, chunksize=chunksize,
+        keep_default_na=False, na_values={c: [""] for c in num_cols},
+    )
+
+
+def split_large(buckets: list, chunksize: int, directory: str, read, rng) -> list:
+    # Buckets acima de 2x chunksize são divididos de novo (lidos em blocos), até caberem:
+    # a memória do treino fica limitada pelo chunksize qualquer que seja o tamanho do arquivo
+    pending, done = list(buckets), []
+    while pending:
+        path, rows = pending.pop()
+        if rows <= 2 * chunksize:
+            if rows:
+                done.append((path, rows))
+            continue
+        n_sub = min(SHUFFLE_BUCKETS_MAX, math.ceil(rows / chunksize))
+        prefix = os.path.splitext(os.path.basename(path))[0]
+        pending.extend(spill(read(path, chunksize), n_sub, directory, prefix, rng))
+        os.remove(path)
+    return done
+
+
+def estimate_rows(csv_path: str, head: pd.DataFrame) -> int:
+    # Pelo tamanho médio das linhas da amostra inicial: só dimensiona os buckets
+    bytes_per_row = len(head.to_csv(index=False).encode("utf-8")) / max(len(head), 1)
+    return int(os.path.getsize(csv_path) / bytes_per_row) + 1
+
+
+def main_chunked(csv_path: str = CSV_PATH, chunksize: int = CHUNK_SIZE, epochs: int = EPOCHS):
+    target = TARGET
+    check_csv(csv_path)
+
+    # Tipos definidos por uma amostra inicial e fixados para todos os blocos
+    head = clean(pd.read_csv(csv_path, nrows=1000))
+    if target not in head.columns:
+        raise ValueError(
+            f"Coluna alvo '{target}' não encontrada.\n"
+            f"Colunas disponíveis: {head.columns.tolist()}"
+        )
+    _, num_cols, cat_cols = build_preprocess(head.drop(columns=[target]))
+    dtypes = {**{c: "float64" for c in num_cols}, **{c: "object" for c in cat_cols + [target]}}
+    columns = head.columns.tolist()
+
+    # Passada de hash: histograma dos bins por classe para o hold-out estratificado
+    hist = {}
+    for chunk in read_chunks(csv_path, chunksize, dtypes):
+        bins = row_hashes(chunk.drop(columns=[target]))
+        for label, idx in chunk.groupby(target).indices.items():
+            counts = hist.setdefault(label, np.zeros(HOLDOUT_BINS, dtype=np.int64))
+            counts += np.bincount(bins[idx], minlength=HOLDOUT_BINS)
+    thresholds = holdout_thresholds(hist)
+
+    # Embaralhamento entre blocos: cada linha de treino vai para um bucket aleatório em disco.
+    # Bases ordenadas (por classe, por data) chegam misturadas ao partial_fit
+    n_buckets = min(SHUFFLE_BUCKETS_MAX, max(1, math.ceil(estimate_rows(csv_path, head) / chunksize)))
+    spill_dir = tempfile.TemporaryDirectory(prefix="obesity_shuffle_")
+
+    def read(path, size=None):
+        return read_bucket(path, columns, dtypes, num_cols, chunksize=size)
+
+    # 1ª passada: estatísticas do scaler, vocabulários, classes, amostra para o drift e buckets
+    scaler = StandardScaler()
+    vocab = {c: set() for c in cat_cols}
+    classes = set()
+    n_rows = n_holdout = 0
+    holdout_per_class = {}
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = None
+
+    def train_frames():
+        nonlocal n_rows, n_holdout, sample
+        for chunk in read_chunks(csv_path, chunksize, dtypes):
+            n_rows += len(chunk)
+            test = holdout_mask(chunk.drop(columns=[target]), chunk[target], thresholds)
+            n_holdout += int(test.sum())
+            for label, n in chunk.loc[test, target].value_counts().items():
+                holdout_per_class[label] = holdout_per_class.get(label, 0) + int(n)
+            train = chunk[~test]
+
+            scaler.partial_fit(train[num_cols])
+            for c in cat_cols:
+                vocab[c].update(chunk[c].unique())
+            classes.update(chunk[target].unique())
+
+            # Amostragem por prioridade aleatória: mantém as REFERENCE_SAMPLE menores chaves
+            keyed = train.drop(columns=[target]).assign(_key=rng.random(len(train)))
+            sample = keyed if sample is None else pd.concat([sample, keyed])
+            sample = sample.nsmallest(REFERENCE_SAMPLE, "_key")
+            yield train
+
+    try:
+        buckets = spill(train_frames(), n_buckets, spill_dir.name, "bucket", rng)
+        buckets = split_large(buckets, chunksize, spill_dir.name, read, rng)
+
+        classes = np.array(sorted(classes))
+        print("✅ 1ª passada:", n_rows, "linhas |", n_holdout, "no hold-out |", len(buckets), "buckets")
+        print("✅ Classes:", classes.tolist())
+
+        # Pré-processamento com as mesmas etapas do modo padrão, mas com as estatísticas do fluxo:
+        # o scaler já ajustado entra congelado, e o fit abaixo só registra as colunas
+        preprocess = ColumnTransformer(
+            transformers=[
+                ("num", Pipeline([("scaler", FrozenEstimator(scaler))]), num_cols),
+                ("cat", OneHotEncoder(handle_unknown="ignore", categories=[sorted(vocab[c]) for c in cat_cols]), cat_cols),
+            ],
+            remainder="drop",
+        )
+        preprocess.fit(head.drop(columns=[target]))
+
+        candidates = {
+            "SGD LogLoss (out-of-core)": SGDClassifier(loss="log_loss", alpha=1e-4, random_state=RANDOM_STATE),
+            "MLP (out-of-core)": MLPClassifier(hidden_layer_sizes=(64, 32), random_state=RANDOM_STATE),
+        }
+
+        # Passadas seguintes: buckets em ordem aleatória, linhas embaralhadas dentro de cada um
+        for epoch in range(epochs):
+            for k in rng.permutation(len(buckets)):
+                bucket = read(buckets[k][0])
+                bucket = bucket.iloc[rng.permutation(len(bucket))]
+                Xt = preprocess.transform(bucket.drop(columns=[target]))
+                y = bucket[target].to_numpy()
+                for clf in candidates.values():
+                    clf.partial_fit(Xt, y, classes=classes)
+            print(f"✅ Época {epoch + 1}/{epochs} concluída")
+    finally:
+        spill_dir.cleanup()
+
+    # Passada final: avaliação no hold-out com matriz de confusão acumulada
+    cms = {name: np.zeros((len(classes), len(classes)), dtype=np.int64) for name in candidates}
+    for chunk in read_chunks(csv_path, chunksize, dtypes):
+        X = chunk.drop(columns=[target])
+        test = holdout_mask(X, chunk[target], thresholds)
+        if not test.any():
+            continue
+        Xt = preprocess.transform(X[test])
+        y = chunk[target].to_numpy()[test]
+        for name, clf in candidates.items():
+            cms[name] += confusion_matrix(y, clf.predict(Xt), labels=classes)
+
+    accs = {name: np.trace(cm) / max(cm.sum(), 1) for name, cm in cms.items()}
+    for name, acc in accs.items():
+        print(f"\n=== {name} ===")
+        print("Accuracy:", round(acc, 4))
+        print("Confusion matrix:\n", cms[name])
+
+    final_name = max(accs, key=accs.get)
+    final_acc = accs[final_name]
+    final_model = Pipeline(steps=[
+        ("prep", preprocess),
+        ("model", candidates[final_name]),
+    ])
+
+    metrics = {
+        "final_model": final_name,
+        "accuracy": float(final_acc),
+        "best_params_if_rf": {},
+        "random_state": RANDOM_STATE,
+        "target": target,
+        "num_features": num_cols,
+        "cat_features": cat_cols,
+        "dataset_shape": [int(n_rows), int(len(head.columns))],
+        "training_mode": "chunked",
+        "chunksize": int(chunksize),
+        "epochs": int(epochs),
+        "holdout_rows": int(n_holdout),
+        "shuffle_buckets": len(buckets),
+        "holdout_per_class": {
+            str(c): {"holdout": holdout_per_class.get(c, 0), "total": int(hist[c].sum())} for c in classes
+        },
+    }
+
+    model_path, metrics_path, reference_path = save_artifacts(
+        final_model, metrics, build_reference(sample.drop(columns=["_key"]), num_cols, cat_cols)
+    )
+
+    print("\n✅ Modelo final:", final_name)
+    print("✅ Accuracy final:", round(final_acc, 4))
+    print("✅ Salvo em:", model_path)
+    print("✅ Métricas salvas em:", metrics_path)
+    print("✅ Referência para drift salva em:", reference_path)
+
+    if final_acc < 0.75:
+        print("\n⚠️ ALERTA: accuracy < 0.75 (abaixo da meta do desafio).")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Treino do modelo de obesidade.")
+    parser.add_argument("--csv", default=CSV_PATH, help="CSV de treino")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Treino out-of-core: lê o CSV em blocos com memória limitada")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Linhas por bloco (modo --chunked)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help="Passadas de treino (modo --chunked)")
+    parser.add_argument("--analyze-features", action="store_true",
+                        help="Importância por permutação e benchmark de modelos com menos features")
+    args = parser.parse_args()
+    if args.chunked and args.analyze_features:
+        # A análise retreina com subconjuntos de features e precisa da base inteira em memória
+        parser.error("--analyze-features não é suportado com --chunked")
+
+    if args.chunked:
+        main_chunked(args.csv, args.chunksize, args.epochs)
+    else:
+        main(args.csv, analyze=args.analyze_features)
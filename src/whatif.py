@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import telemetry
+
+POINTS_1D = 200
+POINTS_2D = 40
+
+
+def variants(row: pd.DataFrame, changes: dict) -> pd.DataFrame:
+    """Repete a linha do paciente trocando as colunas de ``changes`` (arrays de mesmo tamanho)."""
+    n = len(next(iter(changes.values())))
+    batch = row.loc[row.index.repeat(n)].reset_index(drop=True)
+    for col, values in changes.items():
+        batch[col] = np.asarray(values, dtype=float)
+    return batch
+
+
+def score(model, batch: pd.DataFrame) -> np.ndarray:
+    # Um único predict_proba para todas as variações
+    with telemetry.span("whatif.score"):
+        return model.predict_proba(batch)
+
+
+def sweep(model, row: pd.DataFrame, feature: str, lo: float, hi: float, points: int = POINTS_1D) -> pd.DataFrame:
+    values = np.linspace(lo, hi, points)
+    proba = score(model, variants(row, {feature: values}))
+    return pd.DataFrame(proba, columns=model.classes_).assign(**{feature: values})
+
+
+def grid(model, row: pd.DataFrame, fx: str, x_range, fy: str, y_range, points: int = POINTS_2D):
+    xs = np.linspace(*x_range, points)
+    ys = np.linspace(*y_range, points)
+    gx, gy = np.meshgrid(xs, ys)
+    proba = score(model, variants(row, {fx: gx.ravel(), fy: gy.ravel()}))
+    codes = proba.argmax(axis=1).reshape(gy.shape)
+    return xs, ys, codes, proba.max(axis=1).reshape(gy.shape)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos do app são scripts planos em src/ (importados como no Streamlit)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
@@ -0,0 +1,102 @@
+import os
+import time
+import shutil
+import threading
+
+import audit
+from audit import AuditLogger
+
+BURST = 10_000
+THREADS = 8
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_log_does_not_wait_for_a_blocked_writer(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    real_write = AuditLogger._write
+
+    def blocked_write(self, batch):
+        started.set()
+        release.wait()
+        real_write(self, batch)
+
+    monkeypatch.setattr(AuditLogger, "_write", blocked_write)
+    logger = AuditLogger(directory=str(tmp_path), queue_size=10, batch_size=1, flush_interval=0.05)
+
+    logger.log({"i": 0})
+    assert started.wait(5)  # o writer pegou o 1º registro e está preso no disco
+
+    # Com o disco travado, log() só enfileira: 10 cabem na fila, o resto é descartado
+    results = [logger.log({"i": i}) for i in range(1, 100)]
+    assert results.count(True) == 10
+    assert logger.dropped == 89
+
+    release.set()
+    logger.close()
+    assert logger.written == 11
+    assert logger.written + logger.dropped == 100
+
+
+def test_concurrent_burst_accounts_for_every_record(tmp_path):
+    logger = AuditLogger(directory=str(tmp_path), queue_size=100)
+    per_thread = BURST // THREADS
+
+    def burst(t):
+        for i in range(per_thread):
+            logger.log({"thread": t, "i": i})
+
+    threads = [threading.Thread(target=burst, args=(t,)) for t in range(THREADS)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    logger.close(timeout=30)
+
+    assert logger.written + logger.dropped == BURST
+    assert logger.write_errors == 0
+    with open(logger.path, encoding="utf-8") as f:
+        assert sum(1 for _ in f) == logger.written
+
+
+def test_write_failures_are_retried(tmp_path, monkeypatch):
+    failures = {"left": 2}
+    real_open = open
+
+    def flaky_open(*args, **kwargs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise OSError(28, "No space left on device")
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(audit, "open", flaky_open, raising=False)
+    logger = AuditLogger(directory=str(tmp_path), flush_interval=0.05)
+    for i in range(10):
+        logger.log({"i": i})
+
+    assert wait_until(lambda: logger.written == 10)
+    logger.close()
+    assert logger.write_errors == 2
+    assert logger.dropped == 0
+    assert logger.last_error is None
+    assert not logger._thread.is_alive()
+
+
+def test_writer_recreates_removed_directory(tmp_path):
+    directory = tmp_path / "audit"
+    logger = AuditLogger(directory=str(directory), flush_interval=0.05)
+    logger.log({"i": 0})
+    assert wait_until(lambda: logger.written == 1)
+
+    shutil.rmtree(directory)
+    logger.log({"i": 1})
+    assert wait_until(lambda: logger.written == 2)
+    logger.close()
+
+    assert not logger._thread.is_alive()
+    assert os.path.exists(logger.path)
@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+import drift
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(ROOT, "data", "obesity.csv")
+REFERENCE_PATH = os.path.join(ROOT, "models", "reference.json")
+
+
+def test_malformed_numeric_counts_as_missing(tmp_path):
+    df = pd.read_csv(CSV_PATH)
+    df["Age"] = df["Age"].astype(object)
+    df.loc[5, "Age"] = "?"
+    path = tmp_path / "novos.csv"
+    df.to_csv(path, index=False)
+
+    report = drift.run(str(path), REFERENCE_PATH, chunksize=500)
+
+    assert report["n_rows"] == len(df)
+    assert report["numeric"]["Age"]["missing_rate"] * len(df) == 1
+    assert report["numeric"]["Height"]["missing_rate"] == 0
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from explain import ForestExplainer
+from train import TARGET, build_preprocess, clean
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(ROOT, "data", "obesity.csv")
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    df = clean(pd.read_csv(CSV_PATH))
+    X, y = df.drop(columns=[TARGET]), df[TARGET]
+    prep, _, _ = build_preprocess(X)
+    model = Pipeline([
+        ("prep", prep),
+        ("model", RandomForestClassifier(n_estimators=20, random_state=42)),
+    ]).fit(X, y)
+    return model, X
+
+
+def test_contributions_reproduce_predict_proba(fitted):
+    model, X = fitted
+    explainer = ForestExplainer(model)
+    rows = X.iloc[:200]
+
+    contrib = explainer.explain(rows)
+    assert contrib.shape == (len(rows), len(explainer.feature_names), len(model.classes_))
+    np.testing.assert_allclose(explainer.bias + contrib.sum(axis=1), model.predict_proba(rows), atol=1e-9)
+
+
+def test_cache_hits_return_the_same_contributions(fitted):
+    model, X = fitted
+    explainer = ForestExplainer(model)
+    first = explainer.explain(X.iloc[:50])
+
+    # Lote misto: 50 linhas já em cache e 50 novas
+    mixed = explainer.explain(X.iloc[:100])
+    np.testing.assert_array_equal(mixed[:50], first)
+    np.testing.assert_allclose(
+        explainer.bias + mixed.sum(axis=1), model.predict_proba(X.iloc[:100]), atol=1e-9
+    )
+
+    # Entradas do cache não são views do lote que as calculou
+    assert all(v.base is None for v in explainer._cache.values())
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+import train
+
+
+def frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Age": rng.uniform(14, 61, n),
+        "MTRANS": rng.choice(["Walking", "Bike", "nan"], n),
+        "Obesity": np.where(np.arange(n) < n // 50, "Rare", "Common"),  # 2% numa classe rara
+    })
+
+
+def test_holdout_is_stratified_per_class():
+    df = frame(20_000)
+    X, y = df.drop(columns=["Obesity"]), df["Obesity"]
+    hist = {
+        label: np.bincount(train.row_hashes(X.iloc[idx]), minlength=train.HOLDOUT_BINS)
+        for label, idx in df.groupby("Obesity").indices.items()
+    }
+    thresholds = train.holdout_thresholds(hist, pct=20)
+
+    test = train.holdout_mask(X, y, thresholds)
+    share = pd.Series(test).groupby(y.to_numpy()).mean()
+    assert abs(share["Rare"] - 0.20) < 0.01
+    assert abs(share["Common"] - 0.20) < 0.01
+
+    # Determinístico: outra passada sobre as mesmas linhas dá o mesmo lado
+    assert (train.holdout_mask(X, y, thresholds) == test).all()
+
+
+def test_buckets_keep_categorical_nan_strings_and_stay_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(train, "SHUFFLE_BUCKETS_MAX", 2)
+    df = frame(5_000)
+    df.loc[::7, "Age"] = np.nan
+    columns = df.columns.tolist()
+    dtypes = {"Age": "float64", "MTRANS": "object", "Obesity": "object"}
+    rng = np.random.default_rng(0)
+
+    def read(path, size=None):
+        return train.read_bucket(path, columns, dtypes, ["Age"], chunksize=size)
+
+    chunks = [df.iloc[i:i + 500] for i in range(0, len(df), 500)]
+    buckets = train.spill(chunks, 2, str(tmp_path), "bucket", rng)
+    buckets = train.split_large(buckets, 200, str(tmp_path), read, rng)
+
+    assert max(rows for _, rows in buckets) <= 400
+    back = pd.concat([read(path) for path, _ in buckets])
+    assert len(back) == len(df)
+    assert (back["MTRANS"] == "nan").sum() == (df["MTRANS"] == "nan").sum()
+    assert back["Age"].isna().sum() == df["Age"].isna().sum()